@@ -5,107 +5,114 @@ Creates diverse physiological signal patterns including ECG, PPG, and ABP-like s
 """
 
 import numpy as np
-import pandas as pd
 import os
 from pathlib import Path
-import random
+
+def _beat_params(t, heart_rate, noise_level):
+    """Broadcast a batch of heart rates / noise levels against the time axis.
+    Returns (T, hr_hz, noise) shaped (1, L), (B, 1), (B, 1)."""
+    hr = np.atleast_1d(np.asarray(heart_rate, dtype=float))[:, None]
+    noise = np.atleast_1d(np.asarray(noise_level, dtype=float))[:, None]
+    return t[None, :], hr / 60.0, noise
 
 def generate_ecg_like(t, heart_rate=72, noise_level=0.1):
-    """Generate ECG-like signal with P, QRS, T waves"""
-    # Heart rate in Hz
-    hr_hz = heart_rate / 60.0
+    """Generate ECG-like signals with P, QRS, T waves; one row per heart rate"""
+    T, hr_hz, noise = _beat_params(t, heart_rate, noise_level)
+    tau = T % (1.0 / hr_hz)  # time within the current beat, shared by every wave
     
     # P wave (atrial depolarization)
-    p_wave = 0.3 * np.exp(-((t % (1/hr_hz)) - 0.1)**2 / 0.01)
+    p_wave = 0.3 * np.exp(-(tau - 0.1)**2 / 0.01)
     
     # QRS complex (ventricular depolarization) 
-    qrs = 1.0 * np.exp(-((t % (1/hr_hz)) - 0.2)**2 / 0.005)
+    qrs = 1.0 * np.exp(-(tau - 0.2)**2 / 0.005)
     
     # T wave (ventricular repolarization)
-    t_wave = 0.4 * np.exp(-((t % (1/hr_hz)) - 0.4)**2 / 0.02)
+    t_wave = 0.4 * np.exp(-(tau - 0.4)**2 / 0.02)
     
     signal = p_wave + qrs + t_wave
-    signal += noise_level * np.random.randn(len(t))
+    signal += noise * np.random.randn(*signal.shape)
     return signal
 
 def generate_ppg_like(t, heart_rate=72, noise_level=0.1):
-    """Generate PPG-like signal with systolic and diastolic phases"""
-    hr_hz = heart_rate / 60.0
+    """Generate PPG-like signals with systolic and diastolic phases; one row per heart rate"""
+    T, hr_hz, noise = _beat_params(t, heart_rate, noise_level)
+    tau = T % (1.0 / hr_hz)
     
     # Systolic phase (sharp rise)
-    systole = 0.8 * np.exp(-((t % (1/hr_hz)) - 0.1)**2 / 0.01)
+    systole = 0.8 * np.exp(-(tau - 0.1)**2 / 0.01)
     
     # Diastolic phase (gradual decline)
-    diastole = 0.4 * np.exp(-((t % (1/hr_hz)) - 0.3)**2 / 0.05)
+    diastole = 0.4 * np.exp(-(tau - 0.3)**2 / 0.05)
     
     # Dicrotic notch
-    dicrotic = 0.2 * np.exp(-((t % (1/hr_hz)) - 0.4)**2 / 0.01)
+    dicrotic = 0.2 * np.exp(-(tau - 0.4)**2 / 0.01)
     
     signal = systole + diastole + dicrotic
-    signal += noise_level * np.random.randn(len(t))
+    signal += noise * np.random.randn(*signal.shape)
     return signal
 
 def generate_abp_like(t, heart_rate=72, noise_level=0.1):
-    """Generate ABP-like signal with systolic and diastolic pressures"""
-    hr_hz = heart_rate / 60.0
+    """Generate ABP-like signals with systolic and diastolic pressures; one row per heart rate"""
+    T, hr_hz, noise = _beat_params(t, heart_rate, noise_level)
+    tau = T % (1.0 / hr_hz)
     
     # Systolic pressure (peak)
-    systolic = 1.0 * np.exp(-((t % (1/hr_hz)) - 0.1)**2 / 0.008)
+    systolic = 1.0 * np.exp(-(tau - 0.1)**2 / 0.008)
     
     # Diastolic pressure (baseline)
-    diastolic = 0.3 * np.exp(-((t % (1/hr_hz)) - 0.5)**2 / 0.1)
+    diastolic = 0.3 * np.exp(-(tau - 0.5)**2 / 0.1)
     
     # Dicrotic notch
-    dicrotic = 0.4 * np.exp(-((t % (1/hr_hz)) - 0.2)**2 / 0.005)
+    dicrotic = 0.4 * np.exp(-(tau - 0.2)**2 / 0.005)
     
     signal = systolic + diastolic + dicrotic
-    signal += noise_level * np.random.randn(len(t))
+    signal += noise * np.random.randn(*signal.shape)
     return signal
 
 def generate_arhythmia(t, heart_rate=72, noise_level=0.1):
-    """Generate arrhythmic pattern with irregular intervals"""
+    """Generate arrhythmic patterns with irregular intervals; one row per heart rate"""
+    T, hr_hz, noise = _beat_params(t, heart_rate, noise_level)
+    
     # Variable heart rate
-    hr_variations = heart_rate + 20 * np.sin(0.1 * t) + 10 * np.random.randn(len(t))
-    hr_hz = hr_variations / 60.0
-    
-    # Irregular intervals
-    intervals = np.cumsum(1.0 / hr_hz)
-    
-    signal = np.zeros_like(t)
-    for i, interval in enumerate(intervals):
-        if i < len(intervals) - 1:
-            # Create beat at this interval
-            beat_time = interval
-            if beat_time < len(t):
-                # QRS-like complex
-                qrs = 1.0 * np.exp(-((t - beat_time)**2) / 0.01)
-                signal += qrs
-    
-    signal += noise_level * np.random.randn(len(t))
+    hr_hz = hr_hz + (20 * np.sin(0.1 * T) + 10 * np.random.randn(hr_hz.shape[0], len(t))) / 60.0
+    
+    # Irregular intervals (every interval but the last places a beat)
+    intervals = np.cumsum(1.0 / hr_hz, axis=1)[:, :-1]
+    
+    signal = np.zeros((hr_hz.shape[0], len(t)))
+    for row, beat_times in enumerate(intervals):
+        beat_times = beat_times[beat_times < len(t)]
+        # QRS-like complex at every beat, summed over beats in one broadcast
+        signal[row] = np.exp(-((t[None, :] - beat_times[:, None])**2) / 0.01).sum(axis=0)
+    
+    signal += noise * np.random.randn(*signal.shape)
     return signal
 
 def generate_stress_pattern(t, heart_rate=90, noise_level=0.15):
-    """Generate stress-like pattern with elevated heart rate and variability"""
+    """Generate stress-like patterns with elevated heart rate and variability; one row per heart rate"""
+    T, hr_hz, noise = _beat_params(t, heart_rate, noise_level)
+    
     # Elevated and variable heart rate
-    hr_hz = (heart_rate + 15 * np.sin(0.2 * t) + 5 * np.random.randn(len(t))) / 60.0
+    hr_hz = hr_hz + (15 * np.sin(0.2 * T) + 5 * np.random.randn(hr_hz.shape[0], len(t))) / 60.0
+    tau = T % (1.0 / hr_hz)
     
     # More pronounced P wave (sympathetic activation)
-    p_wave = 0.5 * np.exp(-((t % (1/hr_hz)) - 0.1)**2 / 0.008)
+    p_wave = 0.5 * np.exp(-(tau - 0.1)**2 / 0.008)
     
     # Taller QRS
-    qrs = 1.2 * np.exp(-((t % (1/hr_hz)) - 0.2)**2 / 0.004)
+    qrs = 1.2 * np.exp(-(tau - 0.2)**2 / 0.004)
     
     # Inverted T wave (stress indicator)
-    t_wave = -0.3 * np.exp(-((t % (1/hr_hz)) - 0.4)**2 / 0.02)
+    t_wave = -0.3 * np.exp(-(tau - 0.4)**2 / 0.02)
     
     signal = p_wave + qrs + t_wave
-    signal += noise_level * np.random.randn(len(t))
+    signal += noise * np.random.randn(*signal.shape)
     return signal
 
 def main():
     """Generate 1000 diverse time series segments"""
     # Set random seed for reproducibility
-    random.seed(42)
+    rng = np.random.default_rng(42)
     np.random.seed(42)
     
     # Create data directory
@@ -113,6 +120,7 @@ def main():
     data_dir.mkdir(exist_ok=True)
     
     # Time vector for 10-second segments at 256 Hz
+    n_series = 1000
     t = np.linspace(0, 10, 256)
     
     # Generate 1000 segments with different patterns
@@ -126,40 +134,56 @@ def main():
     
     print("Generating 1000 time series segments...")
     
-    for i in range(1000):
-        # Randomly select pattern type
-        pattern_name, pattern_func = random.choice(patterns)
-        
-        # Random parameters
-        heart_rate = random.uniform(60, 100)
-        noise_level = random.uniform(0.05, 0.2)
-        
-        # Generate signal
-        signal = pattern_func(t, heart_rate, noise_level)
-        
-        # Add some random variations
-        if random.random() < 0.3:  # 30% chance of additional variation
-            # Add baseline drift
-            drift = 0.1 * np.sin(0.5 * t + random.uniform(0, 2*np.pi))
-            signal += drift
-            
-        if random.random() < 0.2:  # 20% chance of artifacts
-            # Add artifact spikes
-            spike_times = random.sample(range(50, 200), random.randint(1, 3))
-            for spike_time in spike_times:
-                signal[spike_time] += random.uniform(0.5, 2.0)
-        
+    # Draw every per-segment decision up front, in one vectorized call each
+    pattern_idx = rng.integers(0, len(patterns), size=n_series)
+    heart_rates = rng.uniform(60, 100, n_series)
+    noise_levels = rng.uniform(0.05, 0.2, n_series)
+    
+    # 30% chance of additional variation (baseline drift)
+    add_drift_mask = rng.random(n_series) < 0.3
+    drift_phase = rng.uniform(0, 2*np.pi, n_series)
+    
+    # 20% chance of artifacts: 1-3 distinct spike times in [50, 200) per affected segment
+    add_spike_mask = rng.random(n_series) < 0.2
+    spiked = np.flatnonzero(add_spike_mask)
+    n_spikes = rng.integers(1, 4, size=spiked.size)
+    spike_times = 50 + np.argsort(rng.random((spiked.size, 150)), axis=1)[:, :3]
+    spike_amps = rng.uniform(0.5, 2.0, (spiked.size, 3))
+    keep = np.arange(3)[None, :] < n_spikes[:, None]
+    spike_rows = np.broadcast_to(spiked[:, None], keep.shape)[keep]
+    spike_times, spike_amps = spike_times[keep], spike_amps[keep]
+    
+    # Generate signals, one batched call per pattern
+    signals = np.empty((n_series, len(t)))
+    for p, (_, pattern_func) in enumerate(patterns):
+        rows = np.flatnonzero(pattern_idx == p)
+        if rows.size:
+            signals[rows] = pattern_func(t, heart_rates[rows], noise_levels[rows])
+    
+    # Add baseline drift
+    drifted = np.flatnonzero(add_drift_mask)
+    signals[drifted] += 0.1 * np.sin(0.5 * t[None, :] + drift_phase[drifted, None])
+    
+    # Add artifact spikes
+    np.add.at(signals, (spike_rows, spike_times), spike_amps)
+    
+    for i, signal in enumerate(signals):
         # Create filename
-        filename = f"{pattern_name}_{i:04d}.csv"
+        filename = f"{patterns[pattern_idx[i]][0]}_{i:04d}.csv"
         filepath = data_dir / filename
         
-        # Save as CSV
-        df = pd.DataFrame({"value": signal})
-        df.to_csv(filepath, index=False)
+        # Save as single-column CSV (written directly; a DataFrame per file costs more than the write)
+        with open(filepath, "wb") as f:
+            f.write(b"value\n")
+            np.savetxt(f, signal, fmt="%.17g")
         
         if (i + 1) % 100 == 0:
             print(f"Generated {i + 1}/1000 segments...")
     
+    # Single binary bundle with the same content; load_series_from_dir prefers it over the CSVs
+    ids = np.array([f"{patterns[p][0]}_{i:04d}" for i, p in enumerate(pattern_idx)])
+    np.savez(data_dir / "all.npz", ids=ids, X=signals)
+    
     print(f"Successfully generated 1000 time series segments in {data_dir}/")
     print("Pattern distribution:")
     for pattern_name, _ in patterns:
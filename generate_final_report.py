@@ -6,10 +6,15 @@ analysis of 1000 time series results.
 
 import json
 import numpy as np
+import matplotlib
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
+# Histograms are binned with NumPy; keep Agg's path handling cheap for the rasterization
+plt.rcParams['path.simplify_threshold'] = 1.0
+plt.rcParams['agg.path.chunksize'] = 10000
 from pathlib import Path
 import pandas as pd
-from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 import seaborn as sns
 
 def analyze_clusters(clusters_file):
@@ -26,20 +31,20 @@ def analyze_clusters(clusters_file):
     print(f"- **Average cluster size**: {np.mean([len(c) for c in clusters]):.1f}")
     print(f"- **Cluster size range**: {min([len(c) for c in clusters])} - {max([len(c) for c in clusters])}")
     
-    # Analyze cluster composition by signal type
-    signal_types = ['ECG', 'PPG', 'ABP', 'ARR', 'STR']
-    cluster_composition = []
+    # Analyze cluster composition by signal type: one (cluster, type) count table
+    cluster_id_arr = np.repeat(np.arange(len(clusters)), [len(c) for c in clusters])
+    series_id_arr = np.array([series_id for cluster in clusters for series_id in cluster], dtype=str)
+    types_arr = np.char.partition(series_id_arr, '_')[:, 0] if series_id_arr.size else series_id_arr
+    signal_types, type_codes = np.unique(types_arr, return_inverse=True)
+    composition = np.zeros((len(clusters), len(signal_types)), dtype=int)
+    np.add.at(composition, (cluster_id_arr, type_codes), 1)
     
+    cluster_composition = []
     for i, cluster in enumerate(clusters):
-        type_counts = Counter()
-        for series_id in cluster:
-            signal_type = series_id.split('_')[0]
-            type_counts[signal_type] += 1
-        
         cluster_composition.append({
             'cluster_id': f'c{i}',
             'size': len(cluster),
-            'composition': dict(type_counts)
+            'composition': {str(signal_types[k]): int(composition[i, k]) for k in np.flatnonzero(composition[i])}
         })
     
     # Find clusters with dominant signal types
@@ -112,42 +117,34 @@ def analyze_kadane_intervals(kadane_file):
     
     return scores, intervals
 
-def create_visualizations(reports_dir):
-    """Create summary visualizations"""
-    plots_dir = Path(reports_dir) / "analysis_plots"
-    plots_dir.mkdir(exist_ok=True)
-    
-    # Load data
-    with open(Path(reports_dir) / "clusters.json") as f:
-        clusters_data = json.load(f)
-    with open(Path(reports_dir) / "closest_pairs.json") as f:
-        pairs_data = json.load(f)
-    with open(Path(reports_dir) / "kadane.json") as f:
-        kadane_data = json.load(f)
-    
-    # 1. Cluster size distribution
+def _plot_cluster_sizes(plots_dir, clusters_data):
+    """1. Cluster size distribution"""
     plt.figure(figsize=(10, 6))
     cluster_sizes = [len(cluster) for cluster in clusters_data['clusters']]
-    plt.hist(cluster_sizes, bins=20, alpha=0.7, edgecolor='black')
+    counts, edges = np.histogram(cluster_sizes, bins=20)
+    plt.bar(edges[:-1], counts, width=np.diff(edges), align='edge', alpha=0.7, edgecolor='black')
     plt.xlabel('Cluster Size')
     plt.ylabel('Frequency')
     plt.title('Distribution of Cluster Sizes')
     plt.grid(True, alpha=0.3)
     plt.savefig(plots_dir / "cluster_size_distribution.png", dpi=150, bbox_inches='tight')
     plt.close()
-    
-    # 2. Closest pair distances
+
+def _plot_closest_pair_distances(plots_dir, pairs_data):
+    """2. Closest pair distances"""
     plt.figure(figsize=(10, 6))
     distances = [data['distance'] for data in pairs_data.values() if data['distance'] is not None]
-    plt.hist(distances, bins=20, alpha=0.7, edgecolor='black')
+    counts, edges = np.histogram(distances, bins=20)
+    plt.bar(edges[:-1], counts, width=np.diff(edges), align='edge', alpha=0.7, edgecolor='black')
     plt.xlabel('Closest Pair Distance')
     plt.ylabel('Frequency')
     plt.title('Distribution of Closest Pair Distances')
     plt.grid(True, alpha=0.3)
     plt.savefig(plots_dir / "closest_pair_distances.png", dpi=150, bbox_inches='tight')
     plt.close()
-    
-    # 3. Kadane activity scores by signal type
+
+def _plot_activity_scores(plots_dir, kadane_data):
+    """3. Kadane activity scores by signal type"""
     plt.figure(figsize=(12, 8))
     signal_types = ['ECG', 'PPG', 'ABP', 'ARR', 'STR']
     type_scores = {signal_type: [] for signal_type in signal_types}
@@ -165,6 +162,27 @@ def create_visualizations(reports_dir):
     plt.xticks(rotation=45)
     plt.savefig(plots_dir / "activity_scores_by_type.png", dpi=150, bbox_inches='tight')
     plt.close()
+
+def create_visualizations(reports_dir):
+    """Create summary visualizations"""
+    plots_dir = Path(reports_dir) / "analysis_plots"
+    plots_dir.mkdir(exist_ok=True)
+    
+    # Load data
+    with open(Path(reports_dir) / "clusters.json") as f:
+        clusters_data = json.load(f)
+    with open(Path(reports_dir) / "closest_pairs.json") as f:
+        pairs_data = json.load(f)
+    with open(Path(reports_dir) / "kadane.json") as f:
+        kadane_data = json.load(f)
+    
+    # The three figures are independent; rasterize and save them concurrently
+    with ProcessPoolExecutor(max_workers=3) as ex:
+        futures = [ex.submit(_plot_cluster_sizes, plots_dir, clusters_data),
+                   ex.submit(_plot_closest_pair_distances, plots_dir, pairs_data),
+                   ex.submit(_plot_activity_scores, plots_dir, kadane_data)]
+        for fut in futures:
+            fut.result()
     
     print(f"\n- **Visualizations saved to**: {plots_dir}/")
     print("  - cluster_size_distribution.png")
@@ -9,24 +9,54 @@ strategies, closest-pair algorithms, and Kadane's algorithm.
 __version__ = "1.0.0"
 __author__ = "PulseDB Analysis Team"
 
-from .divide_conquer import divide_and_conquer
-from .closest_pair import closest_pair
-from .kadane import kadane_max_subarray, most_active_interval
-from .metrics import correlation_distance, dtw_distance
-from .io import load_series_from_dir, preprocess_all
-from .report import plot_series, write_json, write_markdown, summarize_clusters
-from .cli import main
+# Submodules are imported on first attribute access, so "import pulse_cluster" (and the
+# plot-pool workers, which import pulse_cluster._render) do not load numba, scipy and pandas
+_EXPORTS = {
+    "divide_and_conquer": "divide_conquer",
+    "closest_pair": "closest_pair",
+    "kadane_max_subarray": "kadane",
+    "kadane_max_subarray_np": "kadane",
+    "most_active_interval": "kadane",
+    "correlation_distance": "metrics",
+    "xcorr_distance": "metrics",
+    "dtw_distance": "metrics",
+    "SeriesTable": "io",
+    "load_series_from_dir": "io",
+    "preprocess_all": "io",
+    "preprocess_table": "io",
+    "stack_series": "io",
+    "plot_series": "report",
+    "plot_series_batch": "report",
+    "plot_series_parallel": "report",
+    "write_json": "report",
+    "write_markdown": "report",
+    "summarize_clusters": "report",
+    "main": "cli",
+}
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        from importlib import import_module
+        return getattr(import_module(f".{_EXPORTS[name]}", __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 __all__ = [
     "divide_and_conquer",
     "closest_pair", 
     "kadane_max_subarray",
+    "kadane_max_subarray_np",
     "most_active_interval",
     "correlation_distance",
+    "xcorr_distance",
     "dtw_distance",
     "load_series_from_dir",
     "preprocess_all",
+    "preprocess_table",
+    "stack_series",
+    "SeriesTable",
     "plot_series",
+    "plot_series_batch",
+    "plot_series_parallel",
     "write_json",
     "write_markdown", 
     "summarize_clusters",
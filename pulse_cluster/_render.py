@@ -0,0 +1,40 @@
+"""Drawing helpers shared by report and its plot-pool workers.
+
+Imports only numpy and matplotlib, so a spawned worker does not pay for numba, scipy or
+pandas; Kadane intervals are computed by the parent and passed in with each job."""
+from __future__ import annotations
+from pathlib import Path
+from typing import Tuple
+import numpy as np
+import matplotlib
+import matplotlib.pyplot as plt
+
+def draw_series(ax, sid: str, x: np.ndarray, interval: Tuple[int, int, float] | None):
+    ax.plot(x)
+    if interval is not None:
+        l, r, s = interval
+        # We'll annotate using default styles (no custom colors)
+        ax.axvspan(l, r, alpha=0.2)
+        ax.set_title(f"{sid} | max-activity [{l},{r}) score={s:.3f}")
+    else:
+        ax.set_title(sid)
+    ax.set_xlabel("sample")
+    ax.set_ylabel("z-scored value")
+
+_worker_fig = None
+
+def init_worker():
+    matplotlib.use("Agg")  # headless: pool workers only write PNGs
+
+def render_one(job) -> str:
+    """Pool task: plot one (out_dir, sid, x, interval) on this process's reused figure."""
+    global _worker_fig
+    out_dir, sid, x, interval = job
+    if _worker_fig is None:
+        _worker_fig = plt.subplots()
+    fig, ax = _worker_fig
+    ax.clear()
+    draw_series(ax, sid, x, interval)
+    fpath = Path(out_dir) / f"{sid}.png"
+    fig.savefig(fpath, dpi=150, bbox_inches="tight")
+    return str(fpath)
@@ -1,27 +1,31 @@
 
 from __future__ import annotations
 import argparse
+import matplotlib
+from functools import partial
 from pathlib import Path
 import numpy as np
 from typing import Dict, List
-from .io import load_series_from_dir, preprocess_all
-from .metrics import correlation_distance, dtw_distance
+from .io import load_series_from_dir, preprocess_table
+from .metrics import correlation_distance, xcorr_distance, dtw_distance, dist_one_to_many, pairwise_distances
 from .divide_conquer import divide_and_conquer
 from .closest_pair import closest_pair
-from .kadane import most_active_interval
-from .report import plot_series, write_json, write_markdown, summarize_clusters
+from .kadane import kadane_batch
+from .report import plot_series_parallel, write_json, write_markdown, summarize_clusters
 import math
 
 def main():
+    matplotlib.use("Agg")  # the CLI only writes PNGs; never needs a display
     ap = argparse.ArgumentParser()
     ap.add_argument("--data_dir", type=str, default="data")
     ap.add_argument("--out_dir", type=str, default="reports")
-    ap.add_argument("--metric", type=str, choices=["correlation","dtw"], default="correlation")
+    ap.add_argument("--metric", type=str, choices=["correlation","xcorr","dtw"], default="correlation")
     ap.add_argument("--dtw_window", type=float, default=0.1, help="fraction of series length (for DTW)")
     ap.add_argument("--target_len", type=int, default=256)
     ap.add_argument("--max_depth", type=int, default=6)
     ap.add_argument("--min_cluster_size", type=int, default=20)
     ap.add_argument("--max_dispersion", type=float, default=None)
+    ap.add_argument("--workers", type=int, default=1, help="threads splitting independent subtrees")
     args = ap.parse_args()
 
     out_dir = Path(args.out_dir); out_dir.mkdir(parents=True, exist_ok=True)
@@ -46,46 +50,55 @@ def main():
             noisy = base + 0.15*np.random.randn(L)
             raw[f"synth_{i:04d}"] = noisy
 
-    series = preprocess_all(raw, target_len=args.target_len)
+    # Contiguous (N, L) matrix; clustering works on row numbers and maps back to ids at the end
+    ids, X, _ = preprocess_table(raw, target_len=args.target_len)
+    series = {sid: X[r] for r, sid in enumerate(ids)}
 
     if args.metric == "correlation":
         dist_fn = correlation_distance
+    elif args.metric == "xcorr":
+        dist_fn = xcorr_distance
     else:
         win = max(1, int(args.dtw_window * args.target_len))
-        dist_fn = lambda a,b: dtw_distance(a,b,window=win)
+        dist_fn = partial(dtw_distance, window=win)
 
-    ids = list(series.keys())
-    clusters = divide_and_conquer(ids, series, dist_fn,
-                                  max_depth=args.max_depth,
-                                  min_cluster_size=args.min_cluster_size,
-                                  max_dispersion=args.max_dispersion)
+    if args.metric == "dtw" and len(ids) >= 2:
+        # Load (or on a cold cache, compile) the parallel DTW kernels the run uses up front
+        pairwise_distances(X[:2], "dtw", win)
+        dist_one_to_many(X, 0, [1], "dtw", win)
+        closest_pair([0, 1], X, dist_fn)
+    row_clusters = divide_and_conquer(list(range(len(ids))), X, dist_fn,
+                                      max_depth=args.max_depth,
+                                      min_cluster_size=args.min_cluster_size,
+                                      max_dispersion=args.max_dispersion,
+                                      workers=args.workers)
+    clusters = [[ids[r] for r in rows] for rows in row_clusters]
 
     # Closest pairs per cluster and Kadane intervals per series
     closest = {}
-    for c_idx, cid_list in enumerate(clusters):
-        if len(cid_list) >= 2:
-            pair, d = closest_pair(cid_list, series, dist_fn)
-            closest[f"c{c_idx}"] = {"pair": pair, "distance": float(d)}
+    for c_idx, rows in enumerate(row_clusters):
+        if len(rows) >= 2:
+            (i, j), d = closest_pair(rows, X, dist_fn)
+            closest[f"c{c_idx}"] = {"pair": (ids[i], ids[j]), "distance": float(d)}
         else:
             closest[f"c{c_idx}"] = {"pair": None, "distance": None}
 
-    kadane_map = {}
-    for sid, x in series.items():
-        l, r, s = most_active_interval(x, transform="absdiff")
-        kadane_map[sid] = {"l": int(l), "r": int(r), "score": float(s)}
+    k_l = np.empty(len(ids), dtype=np.int64)
+    k_r = np.empty(len(ids), dtype=np.int64)
+    k_s = np.empty(len(ids))
+    kadane_batch(X, k_l, k_r, k_s)
+    kadane_map = {sid: {"l": int(k_l[r]), "r": int(k_r[r]), "score": float(k_s[r])}
+                  for r, sid in enumerate(ids)}
 
     # Write reports
     write_json({"clusters": clusters, "summary": summarize_clusters(clusters, series)}, Path(args.out_dir) / "clusters.json")
     write_json(closest, Path(args.out_dir) / "closest_pairs.json")
     write_json(kadane_map, Path(args.out_dir) / "kadane.json")
 
-    # Plots (one per series, annotated with its max-activity interval)
-    count = 0
-    for sid, x in series.items():
-        plot_series(plots_dir, sid, x, annotate_kadane=True)
-        count += 1
-        if count >= 60:  # avoid too many images by default
-            break
+    # Plots (one per series, annotated with its max-activity interval), rendered in parallel
+    items = [(sid, series[sid]) for sid in ids[:60]]  # avoid too many images by default
+    plot_series_parallel(plots_dir, items, annotate_kadane=True)
+    count = len(items)
 
     # Markdown summary
     md = ["# Run Summary",
@@ -1,21 +1,95 @@
 
 from __future__ import annotations
 from typing import Dict, Tuple, List, Callable
+import math
 import numpy as np
+from numba import get_thread_id, njit, prange
 
-def closest_pair(indices: List[str],
-                 series: Dict[str, np.ndarray],
+from .metrics import pairwise_distances, batch_metric, dtw_envelopes, dtw_scratch, lb_keogh, _dtw_core
+from .io import gather_rows, same_length
+
+@njit(cache=True)
+def _tri_index(p):
+    """Flat index p = i*(i-1)/2 + j over the strict lower triangle -> (j, i) with j < i."""
+    i = int((1 + math.sqrt(1 + 8 * p)) / 2)
+    while i * (i - 1) // 2 > p:
+        i -= 1
+    while (i + 1) * i // 2 <= p:
+        i += 1
+    return p - i * (i - 1) // 2, i
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _pair_lower_bounds(X, U, Lo):
+    """LB_Keogh (taken both ways, the larger bound) for every pair in flat pair order."""
+    k = X.shape[0]
+    n_pairs = k * (k - 1) // 2
+    lb = np.empty(n_pairs)
+    for p in prange(n_pairs):
+        j, i = _tri_index(p)
+        lb[p] = max(lb_keogh(X[j], U[i], Lo[i]), lb_keogh(X[i], U[j], Lo[j]))
+    return lb
+
+@njit(parallel=True, cache=True)
+def closest_pair_dtw_batch(X: np.ndarray, window: int, scratch: np.ndarray, chunk: int = 256):
+    """Closest pair under banded DTW over the rows of X (k, L). Returns (i, j, distance), i < j.
+    Pairs are visited in increasing LB_Keogh order, a chunk at a time with the chunk's
+    DTWs threaded; a pair whose bound already reaches the best distance is skipped, and the
+    search stops once the smallest remaining bound does. scratch comes from dtw_scratch(window)."""
+    U, Lo = dtw_envelopes(X, window)
+    lb = _pair_lower_bounds(X, U, Lo)
+    order = np.argsort(lb)
+    n_pairs = order.shape[0]
+    best = np.inf
+    best_p = order[0]
+    start = 0
+    while start < n_pairs and lb[order[start]] < best:
+        stop = min(n_pairs, start + chunk)
+        d = np.full(stop - start, np.inf)
+        for q in prange(stop - start):
+            p = order[start + q]
+            if lb[p] < best:
+                j, i = _tri_index(p)
+                rows = scratch[get_thread_id()]
+                d[q] = _dtw_core(X[j], X[i], window, rows[0], rows[1])
+        q = d.argmin()
+        if d[q] < best:
+            best = d[q]
+            best_p = order[start + q]
+        start = stop
+    j, i = _tri_index(best_p)
+    return j, i, math.sqrt(best)
+
+def closest_pair(indices: List[str] | List[int],
+                 series: Dict[str, np.ndarray] | np.ndarray,
                  dist_fn: Callable[[np.ndarray, np.ndarray], float]) -> Tuple[Tuple[str,str], float]:
-    """Brute-force closest pair inside a subset. Returns ((id1,id2), distance)."""
-    best = (None, None)
-    best_d = 1e18
+    """Brute-force closest pair inside a subset. Returns ((id1,id2), distance).
+    For correlation distance on equal-length series all pairs are scored in one GEMM
+    (xcorr_distance: one FFT per series); for DTW passed as partial(dtw_distance, window=w)
+    they go through the parallel kernel.
+    series may also be an (N, L) matrix, in which case indices are row numbers."""
     n = len(indices)
-    for i in range(n):
-        for j in range(i+1, n):
-            a = series[indices[i]]
-            b = series[indices[j]]
-            d = dist_fn(a, b)
-            if d < best_d:
-                best_d = d
-                best = (indices[i], indices[j])
-    return (best[0], best[1]), float(best_d)
+    batched = batch_metric(dist_fn)
+    if batched is not None and n >= 2 and same_length(series, indices):
+        metric, window = batched
+        X = gather_rows(series, indices).astype(np.float32, copy=False)
+        if metric == "dtw":
+            window = X.shape[1] if window is None else window
+            i, j, d = closest_pair_dtw_batch(X, window, dtw_scratch(window))
+            return (indices[i], indices[j]), float(d)
+        D = pairwise_distances(X, metric)
+        D[np.tril_indices(n)] = np.inf
+        i, j = np.unravel_index(D.argmin(), D.shape)
+        return (indices[i], indices[j]), float(D[i, j])
+    if n < 2:
+        return (None, None), 1e18
+    # Same flat lower-triangle pair order as the batched kernel, reduced with one argmin
+    D = np.empty(n * (n - 1) // 2)
+    p = 0
+    for i in range(1, n):
+        b = series[indices[i]]
+        for j in range(i):
+            D[p] = dist_fn(series[indices[j]], b)
+            p += 1
+    best = int(D.argmin())
+    j, i = _tri_index(best)
+    return (indices[j], indices[i]), float(D[best])
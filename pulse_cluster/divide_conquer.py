@@ -1,55 +1,173 @@
 
 from __future__ import annotations
 from typing import Dict, List, Callable, Tuple
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import numpy as np
 import random
+import threading
+
+from .metrics import (batch_metric, dist_one_to_many, dtw_scratch, pairwise_distances, pairwise_dtw,
+                      parallel_kernels_threadsafe)
+from .io import gather_rows, same_length
+
+def _pivot_distances(others: List[str],
+                     pivot_id: str,
+                     series: Dict[str, np.ndarray] | np.ndarray,
+                     dist_fn: Callable[[np.ndarray, np.ndarray], float]) -> np.ndarray:
+    """Distances from the pivot to every id in others; one batched call when dist_fn allows."""
+    batched = batch_metric(dist_fn)
+    if batched is not None and same_length(series, others + [pivot_id]):
+        if isinstance(series, np.ndarray):
+            return dist_one_to_many(series, pivot_id, others, *batched)
+        return dist_one_to_many(gather_rows(series, [pivot_id] + others), 0, slice(1, None), *batched)
+    pivot = series[pivot_id]
+    d = np.empty(len(others))
+    for k, sid in enumerate(others):
+        d[k] = dist_fn(series[sid], pivot)
+    return d
 
 def _median_split(ids: List[str],
-                  series: Dict[str, np.ndarray],
-                  dist_fn: Callable[[np.ndarray, np.ndarray], float]) -> Tuple[List[str], List[str]]:
+                  series: Dict[str, np.ndarray] | np.ndarray,
+                  dist_fn: Callable[[np.ndarray, np.ndarray], float],
+                  rng: random.Random | None = None) -> Tuple[List[str], List[str]]:
     """Pick a pivot medoid (random), compute distances, split by median distance."""
-    pivot_id = random.choice(ids)
-    pivot = series[pivot_id]
-    dists = [(sid, dist_fn(series[sid], pivot)) for sid in ids if sid != pivot_id]
-    if not dists:
+    pos = (rng or random).randrange(len(ids))
+    pivot_id = ids[pos]
+    others = [sid for k, sid in enumerate(ids) if k != pos]
+    if not others:
         return ids, []
-    med = np.median([d for _, d in dists])
-    left = [sid for sid, d in dists if d <= med] + [pivot_id]
-    right = [sid for sid, d in dists if d > med]
+    d = _pivot_distances(others, pivot_id, series, dist_fn)
+    return _split_at_median(others, pivot_id, d)
+
+def _split_at_median(others: List, pivot_id, d: np.ndarray) -> Tuple[List, List]:
+    """others with d <= median (plus the pivot) on the left, the rest on the right."""
+    # Median by quickselect (O(k)); even counts average the two middle values like np.median
+    h = len(d) // 2
+    if len(d) % 2:
+        med = np.partition(d, h)[h]
+    else:
+        part = np.partition(d, [h - 1, h])
+        med = 0.5 * (part[h - 1] + part[h])
+    mask = d <= med
+    left = [others[k] for k in np.flatnonzero(mask)] + [pivot_id]
+    right = [others[k] for k in np.flatnonzero(~mask)]
     return left, right
 
+def _offdiag_mean(D: np.ndarray) -> float:
+    """Mean pairwise distance from a symmetric (k, k) distance matrix, without index arrays."""
+    k = D.shape[0]
+    return float((D.sum() - np.trace(D)) / (k * (k - 1)))
+
 def _within_dispersion(ids: List[str],
-                       series: Dict[str, np.ndarray],
+                       series: Dict[str, np.ndarray] | np.ndarray,
                        dist_fn: Callable[[np.ndarray, np.ndarray], float]) -> float:
-    """Average pairwise distance inside ids (O(k^2))."""
+    """Average pairwise distance inside ids (O(k^2)); one GEMM/FFT/parallel-DTW batch when dist_fn allows."""
     if len(ids) < 2:
         return 0.0
-    s = 0.0
-    m = 0
-    for i in range(len(ids)):
-        for j in range(i+1, len(ids)):
-            s += dist_fn(series[ids[i]], series[ids[j]])
-            m += 1
-    return s / m
+    batched = batch_metric(dist_fn)
+    if batched is not None and same_length(series, ids):
+        X = gather_rows(series, ids)
+        if batched[0] == "dtw":
+            window = X.shape[1] if batched[1] is None else batched[1]
+            X = np.ascontiguousarray(X, dtype=np.float32)
+            return float(pairwise_dtw(X, window, dtw_scratch(window)).mean())
+        D = pairwise_distances(X, *batched)
+        return _offdiag_mean(D)
+    k = len(ids)
+    rows = [series[sid] for sid in ids]
+    d = np.fromiter((dist_fn(rows[i], rows[j]) for i in range(k) for j in range(i + 1, k)),
+                    dtype=float, count=k * (k - 1) // 2)
+    return float(d.mean())
+
+# Largest id-set for which the root computes the full distance matrix: 256 MB for the
+# float32 correlation matrix, 128 MB for the float64 xcorr/DTW ones (DTW also costs n^2 DTWs)
+_MAX_DENSE = {"correlation": 8192, "xcorr": 4096, "dtw": 4096}
+
+def _run_work_queue(root: List,
+                    depth: int,
+                    is_leaf: Callable[[List, int], bool],
+                    split: Callable[[List, random.Random], Tuple[List, List]],
+                    workers: int) -> List[List]:
+    """Drive the top-down partitioning from an explicit queue of (path, ids, depth, seed) nodes.
+    Each node draws its pivot from its own RNG seeded by its parent, and leaves are ordered by
+    their left/right path, so the clusters do not depend on workers or on scheduling."""
+    leaves = {}
+    lock = threading.Lock()
+
+    def process(path, node, depth, seed):
+        if not is_leaf(node, depth):
+            rng = random.Random(seed)
+            left, right = split(node, rng)
+            if right:
+                return [(path + (0,), left, depth + 1, rng.getrandbits(64)),
+                        (path + (1,), right, depth + 1, rng.getrandbits(64))]
+            node = left
+        with lock:
+            leaves[path] = node
+        return []
+
+    work = deque([((), root, depth, random.getrandbits(64))])
+    if workers <= 1:
+        while work:
+            work.extend(process(*work.popleft()))
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            pending = {ex.submit(process, *work.popleft())}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    work.extend(fut.result())
+                while work:
+                    pending.add(ex.submit(process, *work.popleft()))
+    return [leaves[path] for path in sorted(leaves)]
 
 def divide_and_conquer(ids: List[str],
-                       series: Dict[str, np.ndarray],
+                       series: Dict[str, np.ndarray] | np.ndarray,
                        dist_fn: Callable[[np.ndarray, np.ndarray], float],
                        max_depth: int = 6,
                        min_cluster_size: int = 20,
                        max_dispersion: float | None = None,
-                       depth: int = 0) -> List[List[str]]:
-    """Recursive top-down partitioning; stop on rules -> form a cluster."""
+                       depth: int = 0,
+                       workers: int = 1) -> List[List[str]]:
+    """Top-down partitioning; stop on rules -> form a cluster.
+    series may also be an (N, L) matrix, in which case ids are row numbers.
+    Nodes are processed from a work queue; workers > 1 splits independent subtrees on a
+    thread pool, which pays off when dist_fn releases the GIL (batched metrics). Under numba's
+    workqueue threading layer DTW runs with one worker, as that layer cannot serve
+    concurrent parallel kernels."""
     if len(ids) <= min_cluster_size or depth >= max_depth:
         return [ids]
-    if max_dispersion is not None:
-        disp = _within_dispersion(ids, series, dist_fn)
-        if disp <= max_dispersion:
-            return [ids]
-    left, right = _median_split(ids, series, dist_fn)
-    if not right:
-        return [left]
-    clusters = []
-    clusters += divide_and_conquer(left, series, dist_fn, max_depth, min_cluster_size, max_dispersion, depth+1)
-    clusters += divide_and_conquer(right, series, dist_fn, max_depth, min_cluster_size, max_dispersion, depth+1)
-    return clusters
+    batched = batch_metric(dist_fn)
+    if workers > 1 and batched is not None and batched[0] == "dtw" and not parallel_kernels_threadsafe():
+        workers = 1
+
+    def stop(node, d):
+        if len(node) <= min_cluster_size or d >= max_depth:
+            return True
+        return max_dispersion is not None and _within_dispersion(node, series, dist_fn) <= max_dispersion
+
+    def split(node, rng):
+        return _median_split(node, series, dist_fn, rng)
+
+    if max_dispersion is not None and batched is not None and len(ids) <= _MAX_DENSE[batched[0]]:
+        # Every level re-reads O(k^2) pairs for the dispersion test, so compute them once here
+        if same_length(series, ids):
+            D = pairwise_distances(gather_rows(series, ids), *batched)
+
+            def stop(rows, d):
+                if len(rows) <= min_cluster_size or d >= max_depth or len(rows) < 2:
+                    return True
+                if len(rows) == D.shape[0]:
+                    return _offdiag_mean(D) <= max_dispersion  # root: no copy of D
+                idx = np.asarray(rows, dtype=np.intp)
+                return _offdiag_mean(D[np.ix_(idx, idx)]) <= max_dispersion
+
+            def split(rows, rng):
+                pos = rng.randrange(len(rows))
+                others = rows[:pos] + rows[pos + 1:]
+                return _split_at_median(others, rows[pos], D[rows[pos], others])
+
+            clusters = _run_work_queue(list(range(len(ids))), depth, stop, split, workers)
+            return [[ids[r] for r in c] for c in clusters]
+    return _run_work_queue(list(ids), depth, stop, split, workers)
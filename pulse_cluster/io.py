@@ -1,13 +1,30 @@
 
 from __future__ import annotations
 import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
 import numpy as np
 import pandas as pd
-from typing import List, Tuple, Dict
+from typing import List, NamedTuple, Tuple, Dict
 
 def read_csv_series(path: Path) -> np.ndarray:
     """Read a single-column CSV into a 1D numpy array. Accepts 'value' header or no header."""
+    with open(path) as f:
+        first = f.readline().strip()
+    if "," not in first:
+        # Single column: parse straight to an array, skipping a non-numeric header line
+        try:
+            float(first)
+            skip = 0
+        except ValueError:
+            skip = 1
+        try:
+            arr = np.loadtxt(path, dtype=float, delimiter=",", skiprows=skip, ndmin=1)
+            if arr.ndim == 1:
+                return arr
+        except ValueError:
+            pass
     try:
         df = pd.read_csv(path)
         if df.shape[1] == 1:
@@ -24,33 +41,124 @@ def read_csv_series(path: Path) -> np.ndarray:
         arr = df.iloc[:,0].astype(float).values
     return arr
 
-def load_series_from_dir(data_dir: str | Path, min_len: int = 100) -> Dict[str, np.ndarray]:
-    """Recursively load all CSVs from a directory into a dict id->array, filtering by min_len."""
+BUNDLE_NAME = "all.npz"
+
+def _load_one(path: Path, min_len: int) -> Tuple[str, np.ndarray] | None:
+    """(stem, array) for one CSV, or None if it is unreadable or shorter than min_len."""
+    try:
+        arr = read_csv_series(path)
+    except Exception:
+        return None
+    if arr.size < min_len:
+        return None
+    return path.stem, arr.astype(float)
+
+def load_series_from_dir(data_dir: str | Path, min_len: int = 100,
+                         workers: int = 1) -> Dict[str, np.ndarray]:
+    """Recursively load all CSVs from a directory into a dict id->array, filtering by min_len.
+    If the directory holds an all.npz bundle (arrays 'ids' and 'X' (N, L)) that is up to date
+    (ids match the CSV stems and no CSV is newer), it is loaded and the CSVs are not parsed.
+    workers > 1 parses the files on a thread pool, which overlaps file I/O (e.g. on network
+    storage); local parsing is fast serially."""
     data_dir = Path(data_dir)
-    series = {}
-    for p in data_dir.rglob("*.csv"):
-        try:
-            arr = read_csv_series(p)
-            if arr.size >= min_len:
-                series[p.stem] = arr.astype(float)
-        except Exception as e:
-            # ignore unreadable files
-            continue
-    return series
+    bundle = data_dir / BUNDLE_NAME
+    paths = list(data_dir.rglob("*.csv"))
+    if bundle.is_file():
+        built = bundle.stat().st_mtime
+        # CSVs added, removed or edited after the bundle was written make it stale
+        with np.load(bundle) as z:  # npz members are read on access: X only if fresh
+            ids = z["ids"]
+            fresh = all(p.stat().st_mtime <= built for p in paths) and \
+                (not paths or {p.stem for p in paths} == {str(sid) for sid in ids})
+            X = z["X"] if fresh else None
+        if X is not None:
+            if X.shape[1] < min_len:
+                return {}
+            return {str(sid): X[r].astype(float) for r, sid in enumerate(ids)}
+    load = partial(_load_one, min_len=min_len)
+    if workers > 1:
+        # Threads, not processes: a spawned worker re-imports the package (numba, scipy,
+        # matplotlib), which takes seconds against well under a second to parse data/ serially
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            loaded = list(ex.map(load, paths))
+    else:
+        loaded = map(load, paths)
+    return dict(item for item in loaded if item is not None)
 
 def zscore(x: np.ndarray, eps: float = 1e-8) -> np.ndarray:
     mu = x.mean()
     sigma = x.std()
     return (x - mu) / (sigma + eps)
 
+def zscore_inplace(x: np.ndarray, eps: float = 1e-8, axis: int | None = None) -> np.ndarray:
+    """zscore without temporaries: x (a float array the caller owns) is overwritten and
+    returned. With axis set, each slice along it is standardized on its own."""
+    keep = axis is not None
+    mu = x.mean(axis=axis, keepdims=keep)
+    sigma = x.std(axis=axis, keepdims=keep)
+    x -= mu
+    sigma += eps
+    x /= sigma
+    return x
+
+class SeriesTable(NamedTuple):
+    """Equal-length series packed row-wise: data[id_to_row[sid]] is the series for sid."""
+    ids: List[str]
+    data: np.ndarray  # (N, L) float32, C-contiguous
+    id_to_row: Dict[str, int]
+
+def _interp_rows(G: np.ndarray, target_len: int) -> np.ndarray:
+    """np.interp of every row of G from linspace(0, 1, n) onto linspace(0, 1, target_len),
+    with the bracketing indices and weights computed once for the whole group."""
+    n = G.shape[1]
+    if n == 1:
+        return np.repeat(G, target_len, axis=1)
+    x = np.linspace(0, 1, n)
+    xi = np.linspace(0, 1, target_len)
+    i = np.clip(np.searchsorted(x, xi, side="right") - 1, 0, n - 2)
+    w = (xi - x[i]) / (x[i + 1] - x[i])
+    return G[:, i] + w * (G[:, i + 1] - G[:, i])
+
+def preprocess_table(series: Dict[str, np.ndarray], target_len: int) -> SeriesTable:
+    """Z-score and resample every series to target_len straight into one (N, target_len)
+    float32 matrix. Series are processed a whole same-length group at a time."""
+    keys = list(series.keys())
+    X = np.empty((len(keys), target_len), dtype=np.float32)
+    groups: Dict[int, List[int]] = {}
+    for r, k in enumerate(keys):
+        groups.setdefault(len(series[k]), []).append(r)
+    for n, rows in groups.items():
+        G = zscore_inplace(np.stack([series[keys[r]] for r in rows]).astype(float, copy=False), axis=1)
+        X[rows] = G if n == target_len else _interp_rows(G, target_len)
+    return SeriesTable(keys, X, {k: r for r, k in enumerate(keys)})
+
 def preprocess_all(series: Dict[str, np.ndarray], target_len: int | None = None) -> Dict[str, np.ndarray]:
-    """Z-score each series; optionally resample to target_len via simple linear interpolation."""
-    out = {}
-    for k, arr in series.items():
-        arr2 = zscore(arr)
-        if target_len is not None and len(arr2) != target_len:
-            x = np.linspace(0, 1, len(arr2))
-            xi = np.linspace(0, 1, target_len)
-            arr2 = np.interp(xi, x, arr2)
-        out[k] = arr2
-    return out
+    """Z-score each series; optionally resample to target_len via simple linear interpolation.
+    Output is float32: z-scored signals carry far less than float32 precision. With target_len
+    set, the arrays are the rows of preprocess_table's matrix."""
+    if target_len is None:
+        return {k: zscore_inplace(np.array(arr, dtype=float)).astype(np.float32)
+                for k, arr in series.items()}
+    table = preprocess_table(series, target_len)
+    return {k: table.data[r] for r, k in enumerate(table.ids)}
+
+def stack_series(series: Dict[str, np.ndarray]) -> SeriesTable:
+    """Pack equal-length series into a new C-contiguous (N, L) float32 matrix.
+    Returns a SeriesTable (ids, data, id_to_row)."""
+    ids = list(series.keys())
+    if len({series[sid].size for sid in ids}) > 1:
+        raise ValueError("stack_series needs equal-length series; preprocess with target_len set.")
+    X = np.ascontiguousarray(np.stack([series[sid] for sid in ids]), dtype=np.float32) if ids \
+        else np.empty((0, 0), dtype=np.float32)
+    return SeriesTable(ids, X, {sid: r for r, sid in enumerate(ids)})
+
+def gather_rows(series: Dict[str, np.ndarray] | np.ndarray, ids: List) -> np.ndarray:
+    """Stack the series for ids into a (k, L) matrix; ids are row ints when series is a matrix."""
+    if isinstance(series, np.ndarray):
+        return np.ascontiguousarray(series[np.asarray(ids, dtype=np.intp)])
+    return np.stack([series[sid] for sid in ids])
+
+def same_length(series: Dict[str, np.ndarray] | np.ndarray, ids: List) -> bool:
+    if isinstance(series, np.ndarray):
+        return True
+    return len({series[sid].size for sid in ids}) == 1
@@ -2,6 +2,7 @@
 from __future__ import annotations
 import numpy as np
 from typing import Tuple
+from numba import njit, prange
 
 def kadane_max_subarray(arr: np.ndarray) -> Tuple[int, int, float]:
     """Kadane's algorithm: returns (start_idx, end_idx_exclusive, max_sum)."""
@@ -22,14 +23,56 @@ def kadane_max_subarray(arr: np.ndarray) -> Tuple[int, int, float]:
             best_r = i + 1
     return best_l, best_r, float(max_so_far)
 
+def kadane_max_subarray_np(arr: np.ndarray) -> Tuple[int, int, float]:
+    """Vectorized Kadane via prefix sums; same result and tie-breaking as kadane_max_subarray.
+    The best sum ending at r is cs[r] minus the running minimum of the exclusive prefix sums,
+    and the run starts at the latest index where that minimum was reached."""
+    arr = np.asarray(arr, dtype=float)
+    if arr.size == 0:
+        return 0, 0, -1e18
+    cs = np.cumsum(arr)
+    prefix = np.concatenate(([0.0], cs[:-1]))
+    run_min = np.minimum.accumulate(prefix)
+    best = int(np.argmax(cs - run_min))
+    best_l = best - int(np.argmax(prefix[best::-1] == run_min[best]))
+    return best_l, best + 1, float(cs[best] - run_min[best])
+
+ABSDIFF, SQDIFF = 0, 1
+
+@njit(fastmath=True, cache=True)
+def kadane_core(x, mode):
+    """Kadane over y[k] = |x[k+1]-x[k]| (mode ABSDIFF) or its square (mode SQDIFF),
+    with y formed inside the scan so no diff array is materialized. Returns (l, r, score)."""
+    max_so_far = -1e18
+    max_ending_here = 0.0
+    start = 0
+    best_l = 0
+    best_r = 0
+    for k in range(x.shape[0] - 1):
+        dx = x[k + 1] - x[k]
+        y = dx * dx if mode == SQDIFF else abs(dx)
+        if max_ending_here <= 0:
+            max_ending_here = y
+            start = k
+        else:
+            max_ending_here += y
+        if max_ending_here > max_so_far:
+            max_so_far = max_ending_here
+            best_l = start
+            best_r = k + 1
+    return best_l, best_r, max_so_far
+
 def most_active_interval(x: np.ndarray, transform: str = "absdiff"):
     """Compute the most active interval using Kadane on a transformed sequence.
     transform = 'absdiff' (default) or 'sqdiff'.
     Returns (l, r, score).
     """
-    dx = np.diff(x)
-    if transform == "sqdiff":
-        y = dx * dx
-    else:
-        y = np.abs(dx)
-    return kadane_max_subarray(y)
+    mode = SQDIFF if transform == "sqdiff" else ABSDIFF
+    l, r, s = kadane_core(np.ascontiguousarray(x, dtype=float), mode)
+    return int(l), int(r), float(s)
+
+@njit(parallel=True, cache=True)
+def kadane_batch(X: np.ndarray, out_l: np.ndarray, out_r: np.ndarray, out_s: np.ndarray):
+    """most_active_interval(x, 'absdiff') for every row of X (N, L), threaded over rows."""
+    for i in prange(X.shape[0]):
+        out_l[i], out_r[i], out_s[i] = kadane_core(X[i], ABSDIFF)
@@ -1,31 +1,257 @@
 
 from __future__ import annotations
 import numpy as np
-from typing import Optional
+from typing import Callable, Optional, Tuple
+from functools import partial
+import threading
+from scipy.fft import next_fast_len
+from numba import get_num_threads, get_thread_id, njit, prange, threading_layer
+
+def normalize_for_corr(x: np.ndarray, eps: float = 1e-8) -> np.ndarray:
+    """Mean-centered, unit-L2-norm copy of x: Pearson r of two such vectors is their dot product.
+    A constant series maps to all zeros."""
+    x = x - x.mean()
+    norm = np.sqrt(x @ x)
+    return x / norm if norm >= eps else np.zeros_like(x)
 
 def correlation_distance(a: np.ndarray, b: np.ndarray) -> float:
-    """1 - Pearson correlation in [-1,1] -> distance in [0,2]."""
+    """1 - Pearson correlation in [-1,1] -> distance in [0,2].
+    Computed as a dot product of the centered vectors (no corrcoef matrix)."""
     if a.size != b.size:
         L = min(len(a), len(b))
         a = a[:L]; b = b[:L]
-    if a.std() < 1e-8 or b.std() < 1e-8:
+    a = a - a.mean()
+    b = b - b.mean()
+    saa = float(a @ a)
+    sbb = float(b @ b)
+    if saa < a.size * 1e-16 or sbb < b.size * 1e-16:  # std < 1e-8
         return 1.0
-    r = np.corrcoef(a, b)[0,1]
-    return float(1.0 - r)
+    r = float(a @ b) / np.sqrt(saa * sbb)
+    return float(1.0 - min(1.0, max(-1.0, r)))
+
+@njit(cache=True, fastmath=True, boundscheck=False)
+def _dtw_core(a, b, window, prev, cur):
+    """Sakoe-Chiba banded DTW keeping two rolling rows of the band.
+    Cell (i, j) lives at offset k = j - i + window, so each row holds 2*window+1 cells
+    (+1 padding slot so the up-neighbour lookup at k+1 never leaves the buffer).
+    prev/cur are caller-owned scratch rows of length >= 2*window+2; returns squared DTW."""
+    n, m = a.shape[0], b.shape[0]
+    INF = 1e18
+    prev[:] = INF
+    prev[window] = 0.0  # D[0, 0]
+    for i in range(1, n + 1):
+        cur[:] = INF
+        j_start = max(1, i - window)
+        j_end = min(m, i + window)
+        ai = a[i - 1]
+        for j in range(j_start, j_end + 1):
+            k = j - i + window
+            best = prev[k + 1]              # D[i-1, j]
+            if k > 0 and cur[k - 1] < best:  # D[i, j-1]
+                best = cur[k - 1]
+            if prev[k] < best:              # D[i-1, j-1]
+                best = prev[k]
+            diff = ai - b[j - 1]
+            cur[k] = diff * diff + best
+        prev, cur = cur, prev
+    return prev[m - n + window]
+
+def dtw_scratch(window: int) -> np.ndarray:
+    """One pair of DP rows per numba thread, for the parallel DTW drivers."""
+    return np.empty((get_num_threads(), 2, 2 * window + 2))
+
+def parallel_kernels_threadsafe() -> bool:
+    """Whether the parallel DTW kernels may be launched from several Python threads at once.
+    numba's fallback workqueue layer (no TBB/OpenMP) aborts the process on concurrent launches."""
+    try:
+        layer = threading_layer()
+    except ValueError:
+        # The layer is picked at the first parallel launch; trigger one to find out which
+        dtw_envelopes(np.zeros((1, 2)), 1)
+        layer = threading_layer()
+    return layer != "workqueue"
+
+_scratch = threading.local()
+
+def _dtw_rows(window: int):
+    """This thread's pair of DP rows, grown on demand and reused across dtw_distance calls."""
+    rows = getattr(_scratch, "rows", None)
+    if rows is None or rows.shape[1] < 2 * window + 2:
+        rows = _scratch.rows = np.empty((2, 2 * window + 2))
+    return rows[0], rows[1]
+
+@njit(cache=True)
+def _envelope(x, window, upper, lower):
+    """Running max/min of x over [i-window, i+window] via monotonic index deques (O(L))."""
+    L = x.shape[0]
+    maxq = np.empty(L, np.int64)
+    minq = np.empty(L, np.int64)
+    mh = mt = nh = nt = 0
+    j = 0
+    for i in range(L):
+        while j <= min(L - 1, i + window):
+            while mt > mh and x[maxq[mt - 1]] <= x[j]:
+                mt -= 1
+            maxq[mt] = j
+            mt += 1
+            while nt > nh and x[minq[nt - 1]] >= x[j]:
+                nt -= 1
+            minq[nt] = j
+            nt += 1
+            j += 1
+        while maxq[mh] < i - window:
+            mh += 1
+        while minq[nh] < i - window:
+            nh += 1
+        upper[i] = x[maxq[mh]]
+        lower[i] = x[minq[nh]]
+
+@njit(parallel=True, cache=True)
+def dtw_envelopes(X, window):
+    """Upper/lower LB_Keogh envelopes for every row of X (N, L)."""
+    U = np.empty_like(X)
+    Lo = np.empty_like(X)
+    for r in prange(X.shape[0]):
+        _envelope(X[r], window, U[r], Lo[r])
+    return U, Lo
+
+@njit(fastmath=True, cache=True)
+def lb_keogh(a, upper, lower):
+    """LB_Keogh lower bound on squared banded DTW between a and the series enveloped by
+    (upper, lower); same units as _dtw_core, so it can prune against a squared best."""
+    s = 0.0
+    for i in range(a.shape[0]):
+        if a[i] > upper[i]:
+            d = a[i] - upper[i]
+            s += d * d
+        elif a[i] < lower[i]:
+            d = a[i] - lower[i]
+            s += d * d
+    return s
 
 def dtw_distance(a: np.ndarray, b: np.ndarray, window: Optional[int] = None) -> float:
     """Classic DTW (O(n^2)) with optional Sakoe-Chiba window in samples."""
     n, m = len(a), len(b)
+    a = np.ascontiguousarray(a, dtype=np.float32)
+    b = np.ascontiguousarray(b, dtype=np.float32)
     if window is None:
         window = max(n, m)
     window = max(window, abs(n - m))
-    INF = 1e18
-    D = np.full((n+1, m+1), INF, dtype=float)
-    D[0,0] = 0.0
-    for i in range(1, n+1):
-        j_start = max(1, i - window)
-        j_end = min(m, i + window)
-        for j in range(j_start, j_end+1):
-            cost = (a[i-1] - b[j-1])**2
-            D[i,j] = cost + min(D[i-1,j], D[i,j-1], D[i-1,j-1])
-    return float(np.sqrt(D[n,m]))
+    return float(np.sqrt(_dtw_core(a, b, window, *_dtw_rows(window))))
+
+def _unit_rows(X: np.ndarray, eps: float = 1e-8) -> np.ndarray:
+    """Mean-center and L2-normalize each row so Pearson r reduces to a dot product.
+    Constant rows become all-zero, which yields distance 1.0 like correlation_distance."""
+    X = X - X.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(X, axis=1, keepdims=True)
+    return X / np.where(norms < eps, np.inf, norms)
+
+def pairwise_correlation_distance(X: np.ndarray) -> np.ndarray:
+    """(k, L) stacked series -> (k, k) correlation-distance matrix via a single GEMM."""
+    Z = _unit_rows(np.asarray(X, dtype=np.float32))
+    return 1.0 - Z @ Z.T
+
+def correlation_distance_to(X: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Correlation distance from every row of X (k, L) to a single series y (L,)."""
+    Z = _unit_rows(np.asarray(X, dtype=np.float32))
+    z = _unit_rows(np.asarray(y, dtype=np.float32)[None, :])[0]
+    return 1.0 - Z @ z
+
+def xcorr_distance(a: np.ndarray, b: np.ndarray) -> float:
+    """1 - max normalized cross-correlation over all lags: a shift-tolerant correlation
+    distance in [0,2], computed with zero-padded FFTs in O(L log L)."""
+    za = normalize_for_corr(np.asarray(a, dtype=float))
+    zb = normalize_for_corr(np.asarray(b, dtype=float))
+    n_fft = next_fast_len(len(za) + len(zb) - 1, real=True)
+    corr = np.fft.irfft(np.fft.rfft(za, n_fft) * np.conj(np.fft.rfft(zb, n_fft)), n=n_fft)
+    return float(1.0 - corr.max())
+
+def _xcorr_spectra(X: np.ndarray) -> Tuple[np.ndarray, int]:
+    """rfft of every unit-normalized row, zero-padded so circular = linear correlation."""
+    L = X.shape[1]
+    n_fft = next_fast_len(2 * L - 1, real=True)
+    return np.fft.rfft(_unit_rows(np.asarray(X, dtype=np.float32)), n=n_fft, axis=1), n_fft
+
+def xcorr_distance_to(X: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """xcorr_distance from every row of X (k, L) to y (L,), sharing the FFTs."""
+    F, n_fft = _xcorr_spectra(np.vstack([X, y[None, :]]))
+    return 1.0 - np.fft.irfft(F[:-1] * np.conj(F[-1]), n=n_fft, axis=1).max(axis=1)
+
+def pairwise_xcorr_distance(X: np.ndarray) -> np.ndarray:
+    """(k, L) -> (k, k) xcorr-distance matrix; one FFT per row, one inverse FFT per pair."""
+    F, n_fft = _xcorr_spectra(X)
+    k = X.shape[0]
+    D = np.zeros((k, k))
+    for i in range(k - 1):
+        d = 1.0 - np.fft.irfft(F[i + 1:] * np.conj(F[i]), n=n_fft, axis=1).max(axis=1)
+        D[i, i + 1:] = d
+        D[i + 1:, i] = d
+    return D
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _dtw_one_to_many(X, pivot, window, scratch):
+    out = np.empty(X.shape[0])
+    for r in prange(X.shape[0]):
+        rows = scratch[get_thread_id()]
+        out[r] = _dtw_core(X[r], pivot, window, rows[0], rows[1])
+    return np.sqrt(out)
+
+@njit(parallel=True, fastmath=True, cache=True)
+def pairwise_dtw(M, window, scratch):
+    """All-pairs banded DTW over the rows of M, threaded over rows.
+    Returns the strict upper triangle in row-major order (pair (i, j), i < j, at
+    i*k - i*(i+1)/2 + j - i - 1), i.e. the order of np.triu_indices(k, 1)."""
+    k = M.shape[0]
+    out = np.empty(k * (k - 1) // 2)
+    for i in prange(k):
+        rows = scratch[get_thread_id()]
+        base = i * k - i * (i + 1) // 2 - i - 1
+        for j in range(i + 1, k):
+            out[base + j] = _dtw_core(M[i], M[j], window, rows[0], rows[1])
+    return np.sqrt(out)
+
+def dist_one_to_many(X: np.ndarray, pivot_row, rows, metric: str = "correlation",
+                     window: Optional[int] = None) -> np.ndarray:
+    """Distances from X[pivot_row] to every X[rows] in one batched call (GEMV, FFT or parallel DTW)."""
+    sub = np.ascontiguousarray(X[rows], dtype=np.float32)
+    pivot = np.ascontiguousarray(X[pivot_row], dtype=np.float32)
+    if metric == "correlation":
+        return correlation_distance_to(sub, pivot)
+    if metric == "xcorr":
+        return xcorr_distance_to(sub, pivot)
+    if metric == "dtw":
+        window = X.shape[1] if window is None else window
+        return _dtw_one_to_many(sub, pivot, window, dtw_scratch(window))
+    raise ValueError(f"Unknown metric {metric!r}; expected 'correlation', 'xcorr' or 'dtw'.")
+
+def pairwise_distances(X: np.ndarray, metric: str = "correlation", window: Optional[int] = None) -> np.ndarray:
+    """(k, L) stacked series -> symmetric (k, k) distance matrix for a batch_metric metric."""
+    if metric == "correlation":
+        return pairwise_correlation_distance(X)
+    if metric == "xcorr":
+        return pairwise_xcorr_distance(X)
+    if metric == "dtw":
+        k = X.shape[0]
+        window = X.shape[1] if window is None else window
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        flat = pairwise_dtw(X, window, dtw_scratch(window))
+        D = np.zeros((k, k))
+        start = 0
+        for i in range(k - 1):  # row slices of the flat triangle, no (k^2)-sized index arrays
+            row = flat[start:start + k - i - 1]
+            D[i, i + 1:] = row
+            D[i + 1:, i] = row
+            start += k - i - 1
+        return D
+    raise ValueError(f"No batched pairwise kernel for metric {metric!r}.")
+
+def batch_metric(dist_fn: Callable) -> Optional[Tuple[str, Optional[int]]]:
+    """(metric, window) if dist_fn has a batched kernel, else None.
+    Recognises correlation_distance, xcorr_distance and partial(dtw_distance, window=w)."""
+    if dist_fn is correlation_distance:
+        return "correlation", None
+    if dist_fn is xcorr_distance:
+        return "xcorr", None
+    if isinstance(dist_fn, partial) and dist_fn.func is dtw_distance and not dist_fn.args:
+        return "dtw", dist_fn.keywords.get("window")
+    return None
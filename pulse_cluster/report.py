@@ -1,34 +1,68 @@
 
 from __future__ import annotations
-from typing import Dict, List, Callable, Tuple
+from typing import Dict, Iterable, List, Callable, Tuple
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 import json
+import multiprocessing
+import os
 import numpy as np
 import matplotlib.pyplot as plt
 
+from ._render import draw_series, init_worker, render_one
 from .kadane import most_active_interval
 
 def ensure_dir(p: Path):
     p.mkdir(parents=True, exist_ok=True)
 
+def _interval(x: np.ndarray, annotate_kadane: bool):
+    return most_active_interval(x) if annotate_kadane else None
+
 def plot_series(out_dir: Path, sid: str, x: np.ndarray, annotate_kadane: bool = True):
     ensure_dir(out_dir)
-    plt.figure()
-    plt.plot(x)
-    if annotate_kadane:
-        l, r, s = most_active_interval(x)
-        # We'll annotate using default styles (no custom colors)
-        plt.axvspan(l, r, alpha=0.2)
-        plt.title(f"{sid} | max-activity [{l},{r}) score={s:.3f}")
-    else:
-        plt.title(sid)
-    plt.xlabel("sample")
-    plt.ylabel("z-scored value")
+    fig, ax = plt.subplots()
+    draw_series(ax, sid, x, _interval(x, annotate_kadane))
     fpath = out_dir / f"{sid}.png"
-    plt.savefig(fpath, dpi=150, bbox_inches="tight")
-    plt.close()
+    fig.savefig(fpath, dpi=150, bbox_inches="tight")
+    plt.close(fig)
     return str(fpath)
 
+def plot_series_batch(out_dir: Path, items: Iterable[Tuple[str, np.ndarray]],
+                      annotate_kadane: bool = True) -> List[str]:
+    """plot_series for each (sid, x), drawing every image on one reused figure."""
+    ensure_dir(out_dir)
+    fig, ax = plt.subplots()
+    paths = []
+    try:
+        for sid, x in items:
+            ax.clear()
+            draw_series(ax, sid, x, _interval(x, annotate_kadane))
+            fpath = out_dir / f"{sid}.png"
+            fig.savefig(fpath, dpi=150, bbox_inches="tight")
+            paths.append(str(fpath))
+    finally:
+        plt.close(fig)
+    return paths
+
+# Plots per pool worker below which a spawned process (about 1 s to start) costs more than it saves
+_PLOTS_PER_WORKER = 10
+
+def plot_series_parallel(out_dir: Path, items: List[Tuple[str, np.ndarray]],
+                         annotate_kadane: bool = True, workers: int | None = None) -> List[str]:
+    """plot_series for each (sid, x) across a process pool; returns the paths in input order.
+    The pool is sized from the work (at least _PLOTS_PER_WORKER plots each); small batches
+    are drawn in-process with plot_series_batch."""
+    ensure_dir(out_dir)
+    workers = min(workers or os.cpu_count() or 1, len(items) // _PLOTS_PER_WORKER)
+    if workers <= 1:
+        return plot_series_batch(out_dir, items, annotate_kadane)
+    jobs = [(out_dir, sid, x, _interval(x, annotate_kadane)) for sid, x in items]
+    # spawn, not fork: the caller may already have numba worker threads running.
+    # The task lives in _render, which imports only numpy and matplotlib.
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=init_worker) as ex:
+        return list(ex.map(render_one, jobs, chunksize=max(1, len(jobs) // (4 * workers))))
+
 def write_json(obj, path: Path):
     path.write_text(json.dumps(obj, indent=2))
 
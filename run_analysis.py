@@ -27,7 +27,7 @@ def main():
                        help='Directory containing CSV files (default: data)')
     parser.add_argument('--out_dir', type=str, default='reports', 
                        help='Output directory for results (default: reports)')
-    parser.add_argument('--metric', type=str, choices=['correlation', 'dtw'], 
+    parser.add_argument('--metric', type=str, choices=['correlation', 'xcorr', 'dtw'], 
                        default='correlation', help='Distance metric to use')
     parser.add_argument('--max_depth', type=int, default=6, 
                        help='Maximum clustering depth (default: 6)')
@@ -37,6 +37,8 @@ def main():
                        help='Target series length (default: 256)')
     parser.add_argument('--dtw_window', type=float, default=0.1, 
                        help='DTW window fraction (default: 0.1)')
+    parser.add_argument('--workers', type=int, default=1, 
+                       help='Threads splitting independent clustering subtrees (default: 1)')
     parser.add_argument('--generate_data', action='store_true', 
                        help='Generate 1000 synthetic time series first')
     parser.add_argument('--verify', action='store_true', 
@@ -77,7 +79,8 @@ def main():
         '--metric', args.metric,
         '--max_depth', str(args.max_depth),
         '--min_cluster_size', str(args.min_cluster_size),
-        '--target_len', str(args.target_len)
+        '--target_len', str(args.target_len),
+        '--workers', str(args.workers)
     ]
     
     if args.metric == 'dtw':
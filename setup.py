@@ -9,6 +9,7 @@ setup(
         "scipy", 
         "matplotlib",
         "pandas",
+        "numba",
         "pytest"
     ],
     python_requires=">=3.8",
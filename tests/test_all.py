@@ -1,5 +1,6 @@
 
 import numpy as np
+import pytest
 from pulse_cluster.kadane import kadane_max_subarray, most_active_interval
 from pulse_cluster.metrics import dtw_distance, correlation_distance
 from pulse_cluster.divide_conquer import divide_and_conquer
@@ -33,3 +34,226 @@ def test_divide_and_conquer_clusters():
     from pulse_cluster.metrics import correlation_distance
     clusters = divide_and_conquer(ids, series, correlation_distance, max_depth=4, min_cluster_size=3)
     assert sum(len(c) for c in clusters) == 9
+
+def test_closest_pair_corr_matches_loop():
+    from pulse_cluster.closest_pair import closest_pair
+    rng = np.random.default_rng(0)
+    series = {f"s{i}": rng.standard_normal(32) for i in range(8)}
+    series["s8"] = series["s3"] + 0.01*rng.standard_normal(32)
+    ids = list(series.keys())
+    pair, d = closest_pair(ids, series, correlation_distance)
+    ref_pair, ref_d = closest_pair(ids, series, lambda a, b: correlation_distance(a, b))
+    assert set(pair) == set(ref_pair) == {"s3", "s8"}
+    assert abs(d - ref_d) < 1e-5
+
+def test_dtw_band_matches_full_matrix():
+    def ref(a, b, w):
+        n, m = len(a), len(b)
+        D = np.full((n+1, m+1), np.inf); D[0, 0] = 0.0
+        for i in range(1, n+1):
+            for j in range(max(1, i-w), min(m, i+w)+1):
+                D[i, j] = (a[i-1]-b[j-1])**2 + min(D[i-1, j], D[i, j-1], D[i-1, j-1])
+        return np.sqrt(D[n, m])
+    rng = np.random.default_rng(1)
+    a, b = rng.standard_normal(40), rng.standard_normal(33)
+    for w in (7, 10, 40):
+        assert abs(dtw_distance(a, b, window=w) - ref(a, b, w)) < 1e-4
+    c = rng.standard_normal(40)
+    assert abs(dtw_distance(a, c, window=5) - ref(a, c, 5)) < 1e-4
+
+def test_closest_pair_dtw_batch_matches_loop():
+    from functools import partial
+    from pulse_cluster.closest_pair import closest_pair
+    rng = np.random.default_rng(2)
+    series = {f"s{i}": rng.standard_normal(24) for i in range(7)}
+    ids = list(series.keys())
+    pair, d = closest_pair(ids, series, partial(dtw_distance, window=3))
+    ref_pair, ref_d = closest_pair(ids, series, lambda a, b: dtw_distance(a, b, window=3))
+    assert pair == ref_pair
+    assert abs(d - ref_d) < 1e-4
+
+def test_divide_and_conquer_on_matrix_rows():
+    import math
+    from pulse_cluster.io import stack_series
+    series = {f"s{i}": np.sin(np.linspace(0, 2*math.pi, 64) + 0.1*i) for i in range(9)}
+    ids, X, id2row = stack_series(series)
+    assert X.shape == (9, 64) and X.dtype == np.float32 and id2row["s4"] == 4
+    clusters = divide_and_conquer(list(range(len(ids))), X, correlation_distance, max_depth=4, min_cluster_size=3)
+    assert sorted(r for c in clusters for r in c) == list(range(9))
+
+def test_preprocess_all_float32():
+    from pulse_cluster.io import preprocess_all
+    out = preprocess_all({"a": np.arange(100, dtype=float), "b": np.ones(80)}, target_len=64)
+    assert all(v.dtype == np.float32 and v.shape == (64,) for v in out.values())
+    assert abs(float(out["a"].mean())) < 1e-5
+
+def test_zscore_inplace_matches_zscore():
+    from pulse_cluster.io import zscore, zscore_inplace
+    rng = np.random.default_rng(11)
+    M = rng.standard_normal((4, 30)) * 3 + 1
+    expected = np.stack([zscore(row) for row in M])
+    out = zscore_inplace(M, axis=1)
+    assert out is M and np.allclose(M, expected)
+
+def test_preprocess_table_matches_preprocess_all():
+    from pulse_cluster.io import preprocess_all, preprocess_table, stack_series
+    raw = {"a": np.arange(100, dtype=float), "b": np.sin(np.arange(70.0))}
+    table = preprocess_table(raw, target_len=50)
+    out = preprocess_all(raw, target_len=50)
+    assert table.ids == ["a", "b"] and table.data.dtype == np.float32 and table.data.flags.c_contiguous
+    assert np.array_equal(table.data[table.id_to_row["b"]], out["b"])
+    stacked = stack_series(out)  # always a fresh copy
+    assert np.array_equal(stacked.data, table.data) and not np.shares_memory(stacked.data, out["a"])
+
+def test_dist_one_to_many_matches_scalar():
+    from pulse_cluster.metrics import dist_one_to_many
+    rng = np.random.default_rng(3)
+    X = rng.standard_normal((6, 32)).astype(np.float32)
+    rows = [0, 2, 3, 5]
+    d_corr = dist_one_to_many(X, 1, rows, "correlation")
+    d_dtw = dist_one_to_many(X, 1, rows, "dtw", 4)
+    for k, r in enumerate(rows):
+        assert abs(d_corr[k] - correlation_distance(X[r], X[1])) < 1e-5
+        assert abs(d_dtw[k] - dtw_distance(X[r], X[1], window=4)) < 1e-4
+
+def test_kadane_batch_matches_most_active_interval():
+    from pulse_cluster.kadane import kadane_batch
+    rng = np.random.default_rng(4)
+    X = rng.standard_normal((5, 50))
+    l, r, s = np.empty(5, dtype=np.int64), np.empty(5, dtype=np.int64), np.empty(5)
+    kadane_batch(X, l, r, s)
+    for i in range(5):
+        el, er, es = most_active_interval(X[i], transform="absdiff")
+        assert (l[i], r[i]) == (el, er) and abs(s[i] - es) < 1e-9
+
+def test_lb_keogh_lower_bounds_dtw():
+    from pulse_cluster.metrics import dtw_envelopes, lb_keogh
+    rng = np.random.default_rng(5)
+    X = rng.standard_normal((4, 40)).astype(np.float32)
+    U, Lo = dtw_envelopes(X, 4)
+    for i in range(4):
+        for j in range(4):
+            assert lb_keogh(X[i], U[j], Lo[j]) <= dtw_distance(X[i], X[j], window=4)**2 + 1e-4
+
+def test_load_series_csv_and_bundle(tmp_path):
+    from pulse_cluster.io import load_series_from_dir
+    x = np.linspace(0, 1, 120)
+    (tmp_path / "a.csv").write_text("value\n" + "\n".join(map(str, x.tolist())) + "\n")
+    (tmp_path / "b.csv").write_text("\n".join(map(str, x[:60].tolist())) + "\n")
+    loaded = load_series_from_dir(tmp_path, min_len=100)
+    assert list(loaded) == ["a"] and np.allclose(loaded["a"], x)
+    import os
+    np.savez(tmp_path / "all.npz", ids=np.array(["a", "b"]), X=np.stack([x, -x]))
+    bundled = load_series_from_dir(tmp_path, min_len=100)
+    assert list(bundled) == ["a", "b"] and np.allclose(bundled["b"], -x)
+    later = os.stat(tmp_path / "all.npz").st_mtime + 10
+    os.utime(tmp_path / "b.csv", (later, later))  # CSV edited after the bundle -> stale
+    assert list(load_series_from_dir(tmp_path, min_len=100)) == ["a"]
+    np.savez(tmp_path / "all.npz", ids=np.array(["s0", "s1"]), X=np.stack([x, -x]))
+    os.utime(tmp_path / "all.npz", (later + 10, later + 10))
+    assert list(load_series_from_dir(tmp_path, min_len=100)) == ["a"]  # ids differ from the CSVs
+
+def test_load_series_threaded_matches_serial(tmp_path):
+    from pulse_cluster.io import load_series_from_dir
+    rng = np.random.default_rng(14)
+    (tmp_path / "sub").mkdir()
+    for i in range(12):
+        x = rng.standard_normal(80 if i == 3 else 120)
+        folder = tmp_path / "sub" if i % 2 else tmp_path
+        (folder / f"s{i}.csv").write_text("value\n" + "\n".join(map(str, x.tolist())) + "\n")
+    serial = load_series_from_dir(tmp_path, min_len=100)
+    threaded = load_series_from_dir(tmp_path, min_len=100, workers=4)
+    assert len(serial) == 11 and "s3" not in serial
+    assert list(threaded) == list(serial) and all(np.array_equal(threaded[k], serial[k]) for k in serial)
+
+def test_read_csv_series_header_detection(tmp_path):
+    from pulse_cluster.io import read_csv_series
+    (tmp_path / "h.csv").write_text("amplitude\n1.5\n-2\n3e-1\n")
+    (tmp_path / "n.csv").write_text("1.5\n-2\n3e-1\n")
+    (tmp_path / "m.csv").write_text("t,value\n0,1.5\n1,-2\n2,3e-1\n")
+    for name in ("h", "n", "m"):
+        assert np.allclose(read_csv_series(tmp_path / f"{name}.csv"), [1.5, -2.0, 0.3])
+    (tmp_path / "t.csv").write_text("t\tvalue\n0\t1.5\n1\t-2\n")  # not comma-separated
+    with pytest.raises(Exception):
+        read_csv_series(tmp_path / "t.csv")
+
+def test_xcorr_distance_shift_tolerant_and_batched():
+    from pulse_cluster.metrics import xcorr_distance, dist_one_to_many, pairwise_xcorr_distance
+    t = np.linspace(0, 4*np.pi, 128)
+    a, b = np.sin(t), np.sin(t - 0.8)
+    assert xcorr_distance(a, b) < correlation_distance(a, b)
+    assert 0 <= xcorr_distance(a, -a) <= 2
+    X = np.random.default_rng(6).standard_normal((5, 64))
+    D = pairwise_xcorr_distance(X)
+    d = dist_one_to_many(X, 2, [0, 1, 3, 4], "xcorr")
+    for k, r in enumerate([0, 1, 3, 4]):
+        assert abs(D[2, r] - xcorr_distance(X[2], X[r])) < 1e-5
+        assert abs(d[k] - D[2, r]) < 1e-5
+
+def test_within_dispersion_batched_matches_loop():
+    from pulse_cluster.divide_conquer import _within_dispersion
+    rng = np.random.default_rng(7)
+    series = {f"s{i}": rng.standard_normal(48) for i in range(10)}
+    ids = list(series.keys())
+    fast = _within_dispersion(ids, series, correlation_distance)
+    slow = _within_dispersion(ids, series, lambda a, b: correlation_distance(a, b))
+    assert abs(fast - slow) < 1e-5
+
+def test_kadane_np_matches_reference():
+    from pulse_cluster.kadane import kadane_max_subarray_np
+    rng = np.random.default_rng(8)
+    assert kadane_max_subarray_np(np.array([-2, 1, -3, 4, -1, 2, 1, -5, 4])) == (3, 7, 6.0)
+    for _ in range(200):
+        a = rng.integers(-3, 4, int(rng.integers(1, 25))).astype(float)  # many ties
+        assert kadane_max_subarray_np(a) == kadane_max_subarray(a)
+
+def test_pairwise_dtw_matches_scalar():
+    from functools import partial
+    from pulse_cluster.metrics import pairwise_distances
+    from pulse_cluster.divide_conquer import _within_dispersion
+    rng = np.random.default_rng(9)
+    X = rng.standard_normal((9, 40)).astype(np.float32)
+    D = pairwise_distances(X, "dtw", 5)
+    for i in range(9):
+        for j in range(9):
+            assert abs(D[i, j] - dtw_distance(X[i], X[j], window=5)) < 1e-4
+    fast = _within_dispersion(list(range(9)), X, partial(dtw_distance, window=5))
+    slow = _within_dispersion(list(range(9)), X, lambda a, b: dtw_distance(a, b, window=5))
+    assert abs(fast - slow) < 1e-4
+
+def test_divide_and_conquer_dense_matches_per_node():
+    import random
+    rng = np.random.default_rng(10)
+    series = {f"s{i}": rng.standard_normal(32) for i in range(60)}
+    ids = list(series.keys())
+    random.seed(3)
+    dense = divide_and_conquer(ids, series, correlation_distance, min_cluster_size=4, max_dispersion=0.9)
+    random.seed(3)
+    slow = divide_and_conquer(ids, series, lambda a, b: correlation_distance(a, b),
+                              min_cluster_size=4, max_dispersion=0.9)
+    assert dense == slow
+
+def test_divide_and_conquer_threaded_matches_serial():
+    import random
+    rng = np.random.default_rng(12)
+    X = rng.standard_normal((200, 32)).astype(np.float32)
+    runs = []
+    for workers in (1, 4):
+        random.seed(5)
+        runs.append(divide_and_conquer(list(range(200)), X, correlation_distance,
+                                       min_cluster_size=10, workers=workers))
+    assert runs[0] == runs[1]
+    assert sorted(r for c in runs[0] for r in c) == list(range(200))
+
+def test_divide_and_conquer_threaded_dtw_matches_serial():
+    import random
+    from functools import partial
+    rng = np.random.default_rng(13)
+    X = rng.standard_normal((120, 32)).astype(np.float32)
+    dist_fn = partial(dtw_distance, window=4)
+    runs = []
+    for workers in (1, 4):
+        random.seed(6)
+        runs.append(divide_and_conquer(list(range(120)), X, dist_fn, min_cluster_size=10,
+                                       max_dispersion=0.0, workers=workers))
+    assert runs[0] == runs[1]